@@ -2,24 +2,103 @@ import sys
 import os
 import time
 import json
+import math
+import collections
+import ctypes
+import functools
 import pyautogui
+import pyscreeze
 import pyperclip
 import traceback
-from typing import Callable, Optional
+from concurrent.futures import Future, ThreadPoolExecutor, CancelledError
+from PIL import Image
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
 import subprocess
+import threading
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                                QPushButton, QLabel, QComboBox, QLineEdit, QScrollArea, 
-                               QFileDialog, QTextEdit, QMessageBox, QFrame)
-from PySide6.QtCore import Qt, QThread, Signal
+                               QFileDialog, QPlainTextEdit, QMessageBox, QFrame, QRubberBand, QCheckBox)
+from PySide6.QtCore import Qt, QThread, Signal, QTimer, QRect, QSize, QMutex, QMutexLocker
+from PySide6.QtGui import QGuiApplication, QPainter, QColor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import cv2
+except ImportError:  # 未安装 opencv-python 时退回 NumPy / pyscreeze 的找图实现
+    cv2 = None
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时用标准库 json 读写配置
+    orjson = None
+
+try:
+    import mss
+except ImportError:  # 未安装 mss 时退回 pyautogui 截图
+    mss = None
+
+try:
+    import Quartz
+except ImportError:  # 非 macOS 或未安装 pyobjc 时退回 pyautogui 截图
+    Quartz = None
+
+try:
+    from AppKit import NSScreen, NSWorkspace
+except ImportError:  # 非 macOS 或未安装 pyobjc 时退回 osascript / 截图测量
+    NSScreen = None
+    NSWorkspace = None
 
 # --------------------------
 # 核心逻辑 (原 waterRPA.py)
 # --------------------------
 
+# 关掉 pyautogui 每个动作后默认 0.1 秒的停顿；需要等待的地方由任务自己显式 sleep
+pyautogui.PAUSE = 0
+
+# 找不到图片时抛出的异常：pyautogui 与 pyscreeze 各有一个同名但不同的类，
+# 这里直接调用 pyscreeze.locate，抛出的是 pyscreeze 的那个，两个都要捕获
+_IMAGE_NOT_FOUND = (
+    pyautogui.ImageNotFoundException,
+    getattr(pyscreeze, "ImageNotFoundException", pyautogui.ImageNotFoundException),
+)
+
+# 无限等待找图时的轮询间隔：从 5ms 开始按 1.5 倍退避，最长 100ms
+_POLL_DELAY_MIN = 0.005
+_POLL_DELAY_MAX = 0.1
+_POLL_BACKOFF = 1.5
+# 长时间找不到图片时，每隔这么久输出一次"仍在查找"的日志（秒）
+_SEARCH_LOG_INTERVAL = 2.0
+
+# NSWorkspace 单例（首次使用时获取）
+_workspace = None
+# osascript 失败过一次后不再尝试，避免每次点击都白白起子进程
+_osascript_available = True
+
+
 def _get_frontmost_app_name() -> Optional[str]:
     """macOS: 获取最前台应用名（用于判断是否只是激活窗口而未触发控件）。"""
+    global _workspace, _osascript_available
     if not _is_macos():
         return None
+
+    # 优先走进程内的 NSWorkspace 调用（微秒级），避免每次都起 osascript 子进程
+    if NSWorkspace is not None:
+        try:
+            if _workspace is None:
+                _workspace = NSWorkspace.sharedWorkspace()
+            app = _workspace.frontmostApplication()
+            name = app.localizedName() if app is not None else None
+            return name or None
+        except Exception:
+            pass
+
+    if not _osascript_available:
+        return None
     try:
         res = subprocess.run(
             [
@@ -32,10 +111,12 @@ def _get_frontmost_app_name() -> Optional[str]:
             timeout=1,
         )
         if res.returncode != 0:
+            _osascript_available = False
             return None
         name = (res.stdout or "").strip()
         return name or None
     except Exception:
+        _osascript_available = False
         return None
 
 
@@ -47,34 +128,56 @@ class StepFailed(Exception):
     """某个步骤执行失败（按策略：失败即停止整个任务）。"""
 
 
+class _StopSignal(threading.Event):
+    """
+    停止信号：用法同 threading.Event，set() 时另外唤醒登记过的等待者
+    （正在等找图结果的 _wait_locate），让它们不必等正在进行的截图+找图结束。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._waiters = set()
+        self._waiters_lock = threading.Lock()
+
+    def set(self):
+        super().set()
+        with self._waiters_lock:
+            waiters = list(self._waiters)
+        for waiter in waiters:
+            waiter.set()
+
+    def add_waiter(self, waiter: threading.Event):
+        with self._waiters_lock:
+            self._waiters.add(waiter)
+        if self.is_set():
+            waiter.set()
+
+    def remove_waiter(self, waiter: threading.Event):
+        with self._waiters_lock:
+            self._waiters.discard(waiter)
+
+
 def _is_macos() -> bool:
     return sys.platform == "darwin"
 
 
 def _cancellable_sleep(
     seconds: float,
-    should_stop: Optional[Callable[[], bool]] = None,
-    tick: float = 0.1,
+    stop_event: Optional[threading.Event] = None,
 ):
-    """分片 sleep，确保 stop 能在 tick 粒度内生效。"""
+    """可取消的 sleep：stop_event 被 set 时立即唤醒并抛出 TaskStopped。"""
+    if stop_event is not None and stop_event.is_set():
+        raise TaskStopped("任务已停止")
     if seconds <= 0:
         return
-    if tick <= 0:
-        tick = 0.1
-
-    end_time = time.time() + seconds
-    while True:
-        if should_stop and should_stop():
-            raise TaskStopped("任务已停止")
-
-        remaining = end_time - time.time()
-        if remaining <= 0:
-            return
-
-        time.sleep(min(tick, remaining))
+    if stop_event is None:
+        time.sleep(seconds)
+        return
+    if stop_event.wait(seconds):
+        raise TaskStopped("任务已停止")
 
 
-def _normalize_xy_for_macos_retina(
+def _normalize_xy_to_screen(
     x: float,
     y: float,
     *,
@@ -82,11 +185,10 @@ def _normalize_xy_for_macos_retina(
     scale_y: Optional[float],
 ) -> tuple:
     """
-    macOS Retina 常见现象：截图像素坐标是屏幕点坐标的 2 倍。
+    截图像素坐标 -> 屏幕坐标。
+    macOS Retina / 系统缩放下截图像素可能是屏幕点坐标的 2 倍；
     若检测到 scale != 1，则把 locate 的坐标缩放回屏幕坐标。
     """
-    if not _is_macos():
-        return x, y
     if not scale_x or not scale_y:
         return x, y
     if abs(scale_x - 1.0) < 0.01 and abs(scale_y - 1.0) < 0.01:
@@ -95,260 +197,1251 @@ def _normalize_xy_for_macos_retina(
     return x / scale_x, y / scale_y
 
 
+# (screen_w, screen_h, scale_x, scale_y)，进程内只测一次；
+# 显示配置变化时由 GUI 调用 _invalidate_scale_cache() 失效
+_scale_cache = None
+
+
+def _get_screen_scale() -> tuple:
+    """屏幕尺寸，以及 截图像素 / 屏幕坐标 的比例（Retina 下通常为 2）。"""
+    global _scale_cache
+    cache = _scale_cache
+    if cache is not None:
+        return cache
+
+    try:
+        screen_w, screen_h = pyautogui.size()
+    except Exception:
+        screen_w, screen_h = None, None
+
+    scale_x = scale_y = None
+    # macOS 直接读 backingScaleFactor，省掉一次全屏截图
+    if _is_macos() and NSScreen is not None:
+        try:
+            # screens()[0] 是主屏（菜单栏所在屏，pyautogui 坐标原点）；
+            # mainScreen() 是当前焦点窗口所在屏，多显示器时可能是另一块屏
+            scale_x = scale_y = float(NSScreen.screens()[0].backingScaleFactor())
+        except Exception:
+            scale_x = scale_y = None
+    if scale_x is None:
+        try:
+            shot_w, shot_h = pyautogui.screenshot().size
+        except Exception:
+            shot_w, shot_h = None, None
+        scale_x = (shot_w / screen_w) if (shot_w and screen_w) else None
+        scale_y = (shot_h / screen_h) if (shot_h and screen_h) else None
+
+    cache = (screen_w, screen_h, scale_x, scale_y)
+    _scale_cache = cache
+    return cache
+
+
+def _invalidate_scale_cache(*_args):
+    """显示器分辨率/缩放变化后调用，下次 run_tasks 重新测量。"""
+    global _scale_cache
+    _scale_cache = None
+    # 模板上记住的命中比例/位置也随之失效，下次重新加载
+    _load_needle_cached.cache_clear()
+
+
+def _region_to_pixels(region, scale_x: Optional[float], scale_y: Optional[float]):
+    """屏幕坐标区域 (x, y, w, h) -> 截图像素区域；region 为空返回 None。"""
+    if not region:
+        return None
+    sx = scale_x or 1.0
+    sy = scale_y or 1.0
+    x, y, w, h = region
+    return (int(round(x * sx)), int(round(y * sy)), int(round(w * sx)), int(round(h * sy)))
+
+
+def _pil_gray(img):
+    """无 OpenCV 时的灰度转换：PIL.Image 或 ndarray -> 单通道 uint8 ndarray（PIL 的 L 模式，权重同 OpenCV）。"""
+    if isinstance(img, Image.Image):
+        return np.asarray(img if img.mode == "L" else img.convert("L"))
+    arr = np.asarray(img)
+    if arr.ndim == 2:
+        return arr
+    return np.asarray(Image.fromarray(np.ascontiguousarray(arr[..., :3])).convert("L"))
+
+
+def _to_gray(img):
+    """
+    PIL.Image 或 RGB/RGBA/灰度 ndarray -> 灰度 ndarray。
+    灰度化统一走 cv2.cvtColor（SIMD 实现），不用 PIL 的 convert("L")。
+    """
+    if isinstance(img, Image.Image):
+        if img.mode not in ("L", "RGB", "RGBA"):
+            img = img.convert("RGB")
+        img = np.asarray(img)
+    if img.ndim == 2:
+        return img
+    if img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_RGBA2GRAY)
+    return cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+
+
+# 金字塔层数：原图、1/2、1/4
+_PYRAMID_LEVELS = 3
+# 最粗层上模板的最小边长，再小就少降一层，避免特征丢失
+_PYRAMID_MIN_SIZE = 12
+# 粗层只用来找候选位置，阈值放宽到 0.7（不高于用户置信度）；最终以原图层的得分为准
+_COARSE_CONFIDENCE = 0.7
+# 精化时在候选位置周围额外搜索的像素（按粗层计，回到原图时乘以缩放倍数）
+_REFINE_PAD = 4
+# 粗层最多取几个候选峰回原图精化
+_COARSE_CANDIDATES = 3
+
+
+def _gray_pyramid(gray, levels: int) -> list:
+    """灰度图 -> 高斯金字塔 [原图, 1/2, 1/4, ...]。"""
+    pyramid = [gray]
+    for _ in range(levels - 1):
+        pyramid.append(cv2.pyrDown(pyramid[-1]))
+    return pyramid
+
+
+def _downscale(gray, levels: int):
+    """
+    截图缩到金字塔第 levels 层的工作分辨率。
+    必须和模板金字塔一样逐层 pyrDown：换成 INTER_AREA 等其它插值，
+    两边的平滑方式不同，粗层得分会偏低，部分目标掉到粗匹配阈值以下。
+    只保留最后一层，中间层用完即弃。
+    """
+    for _ in range(levels):
+        gray = cv2.pyrDown(gray)
+    return gray
+
+
+class _Needle:
+    """预加载的模板图片：路径校验与解码在提交任务时做一次，之后每轮找图直接复用。"""
+
+    __slots__ = ("path", "_image", "scale_hint", "next_sweep", "last_loc", "_gray", "_luma")
+
+    def __init__(self, path: Optional[str], image=None, gray=None):
+        self.path = path
+        # PIL.Image (RGB)；OpenCV 直接解码出灰度图时不再经过 PIL，按需再加载
+        self._image = image
+        # 已确认能命中的比例（原比例命中记为 1.0）；确认后不再做多尺度全量扫描
+        self.scale_hint = None
+        # 比例未知时，下一次允许全量多尺度扫描的时间（time.monotonic）
+        self.next_sweep = 0.0
+        # 上次命中的中心点（屏幕像素坐标），下次优先在其附近找
+        self.last_loc = None
+        # 灰度高斯金字塔 [原图, 1/2, 1/4]（OpenCV 找图使用，按需生成）
+        self._gray = _gray_pyramid(gray, _PYRAMID_LEVELS) if gray is not None else None
+        # 单通道灰度 ndarray（NumPy 找图使用，由 PIL 转换，按需生成）
+        self._luma = None
+
+    @property
+    def image(self):
+        if self._image is None:
+            with Image.open(self.path) as im:
+                self._image = im.convert("RGB")
+        return self._image
+
+    def size(self) -> Tuple[int, int]:
+        """模板原始尺寸 (w, h)。"""
+        if self._gray is not None:
+            h, w = self._gray[0].shape[:2]
+            return w, h
+        return self.image.size
+
+    def pyramid(self):
+        if self._gray is None:
+            self._gray = _gray_pyramid(_to_gray(self.image), _PYRAMID_LEVELS)
+        return self._gray
+
+    def luma(self):
+        if self._luma is None:
+            self._luma = _pil_gray(self.image)
+        return self._luma
+
+    def __str__(self):
+        return self.path or "<image>"
+
+
+@functools.lru_cache(maxsize=64)
+def _load_needle_cached(path: str, mtime: float) -> _Needle:
+    """按 路径+mtime 缓存解码后的模板图片，文件被修改后自动失效。"""
+    if cv2 is not None:
+        # np.fromfile + imdecode 可读取 Windows 下的中文路径（cv2.imread 不行）
+        gray = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gray is not None:
+            return _Needle(path, gray=gray)
+    with Image.open(path) as im:
+        needle = _Needle(path, im.convert("RGB"))
+    # 找图要用的数组随模板一起缓存，轮询循环里不再做任何转换
+    if cv2 is not None:
+        needle.pyramid()
+    elif np is not None:
+        needle.luma()
+    return needle
+
+
+def _load_needle(path: str) -> _Needle:
+    """图片路径 -> _Needle；文件缺失或无法解码时抛出 StepFailed。"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        raise StepFailed(f"图片文件不存在: {path}")
+    try:
+        return _load_needle_cached(path, mtime)
+    except Exception as e:
+        raise StepFailed(f"图片无法读取: {path} ({e})")
+
+
+# 多尺度匹配的模板缩放比例：0.5 ~ 2.0，步长 0.1
+_MATCH_SCALES = tuple(round(0.5 + 0.1 * i, 1) for i in range(16))
+# 比例未知时，同一模板两次全量多尺度扫描之间的最短间隔（秒）
+_SCALE_SWEEP_INTERVAL = 2.0
+
+
+def _invariant_scale_match(needle_gray, haystack_gray, confidence: float, scales=_MATCH_SCALES):
+    """
+    多尺度模板匹配：模板截图时的缩放比例与当前屏幕不一致时（Retina / 系统缩放），
+    逐个比例缩放模板后匹配，保留得分最高者。
+    返回 (max_val, max_loc, scale, w, h)，均未达到 confidence 返回 None。
+    """
+    hay_h, hay_w = haystack_gray.shape[:2]
+    best = None
+    for scale in scales:
+        interp = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        resized = cv2.resize(needle_gray, None, fx=scale, fy=scale, interpolation=interp)
+        h, w = resized.shape[:2]
+        if h < 4 or w < 4 or h > hay_h or w > hay_w:
+            continue
+        res = cv2.matchTemplate(haystack_gray, resized, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        if best is None or max_val > best[0]:
+            best = (max_val, max_loc, scale, w, h)
+
+    if best is None or best[0] < confidence:
+        return None
+    return best
+
+
+def _match_best(haystack_gray, tmpl_gray):
+    """整图 matchTemplate，返回 (max_val, (x, y))；模板比图大时返回 None。"""
+    th, tw = tmpl_gray.shape[:2]
+    if th > haystack_gray.shape[0] or tw > haystack_gray.shape[1]:
+        return None
+    res = cv2.matchTemplate(haystack_gray, tmpl_gray, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(res)
+    return max_val, max_loc
+
+
+def _coarse_candidates(res, threshold: float, limit: int, tmpl_shape):
+    """
+    从粗层响应图里按得分从高到低取至多 limit 个 >= threshold 的峰，返回 (val, (x, y))。
+    每取一个峰就把它周围半个模板大小的邻域压掉，避免同一目标被重复取到。会修改 res。
+    """
+    th, tw = tmpl_shape[:2]
+    ry, rx = max(1, th // 2), max(1, tw // 2)
+    for _ in range(limit):
+        _, max_val, _, (x, y) = cv2.minMaxLoc(res)
+        if max_val < threshold:
+            return
+        yield max_val, (x, y)
+        res[max(0, y - ry):y + ry + 1, max(0, x - rx):x + rx + 1] = -1.0
+
+
+def _match_roi(haystack_gray, tmpl_gray, x: int, y: int, pad: int):
+    """只在预估左上角 (x, y) 周围 pad 像素内匹配，返回 (max_val, (x, y))，坐标为整图坐标。"""
+    th, tw = tmpl_gray.shape[:2]
+    x0 = max(0, x - pad)
+    y0 = max(0, y - pad)
+    x1 = min(haystack_gray.shape[1], x + tw + pad)
+    y1 = min(haystack_gray.shape[0], y + th + pad)
+    hit = _match_best(haystack_gray[y0:y1, x0:x1], tmpl_gray)
+    if hit is None:
+        return None
+    max_val, (lx, ly) = hit
+    return max_val, (x0 + lx, y0 + ly)
+
+
+def _locate_center_opencv(
+    needle: _Needle,
+    haystack,
+    confidence: float,
+):
+    """
+    OpenCV 灰度金字塔模板匹配（TM_CCOEFF_NORMED）：
+    截图一次性缩到工作分辨率（默认 1/4，对应模板金字塔最粗层）整图匹配找候选，
+    取得分最高的几个候选回到原图，只在候选邻域内精化并以原图得分判定；原比例未命中时在工作分辨率上做多尺度兜底
+    （每个模板确认比例后不再全量扫描，未确认前最多每 2 秒扫描一次）。
+    返回 haystack 像素坐标下的中心点，找不到返回 None。
+    """
+    tmpl_pyr = needle.pyramid()
+    top = len(tmpl_pyr) - 1
+    while top > 0 and min(tmpl_pyr[top].shape[:2]) < _PYRAMID_MIN_SIZE:
+        top -= 1
+    factor = 1 << top
+    hay_gray = _to_gray(haystack)
+    hay_work = _downscale(hay_gray, top)
+    coarse_confidence = min(confidence, _COARSE_CONFIDENCE) if top > 0 else confidence
+
+    tmpl_work = tmpl_pyr[top]
+    if tmpl_work.shape[0] <= hay_work.shape[0] and tmpl_work.shape[1] <= hay_work.shape[1]:
+        res = cv2.matchTemplate(hay_work, tmpl_work, cv2.TM_CCOEFF_NORMED)
+        # 降采样后真正的目标不一定是粗层最高分，取前几个峰逐个回原图精化
+        limit = _COARSE_CANDIDATES if top > 0 else 1
+        for hit in _coarse_candidates(res, coarse_confidence, limit, tmpl_work.shape):
+            if top > 0:
+                _, (x, y) = hit
+                hit = _match_roi(hay_gray, tmpl_pyr[0], x * factor, y * factor, _REFINE_PAD * factor)
+            if hit is not None and hit[0] >= confidence:
+                _, (x, y) = hit
+                needle.scale_hint = 1.0
+                th, tw = tmpl_pyr[0].shape[:2]
+                return pyscreeze.Point(x + tw // 2, y + th // 2)
+
+    # 原比例未命中：模板可能是在另一种缩放下截的，在最粗层做多尺度兜底。
+    # 比例已确认时只试该比例（多半只是控件还没出现）；比例未知时全量扫描，但限频
+    hint = needle.scale_hint
+    if hint is not None:
+        if hint == 1.0:
+            return None
+        scaled = _invariant_scale_match(tmpl_pyr[top], hay_work, coarse_confidence, scales=(hint,))
+    else:
+        now = time.monotonic()
+        if now < needle.next_sweep:
+            return None
+        needle.next_sweep = now + _SCALE_SWEEP_INTERVAL
+        scaled = _invariant_scale_match(tmpl_pyr[top], hay_work, coarse_confidence)
+    if scaled is None:
+        return None
+
+    _, (x, y), scale, _, _ = scaled
+    interp = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    tmpl = cv2.resize(tmpl_pyr[0], None, fx=scale, fy=scale, interpolation=interp)
+    hit = _match_roi(hay_gray, tmpl, x * factor, y * factor, _REFINE_PAD * factor)
+    if hit is None or hit[0] < confidence:
+        return None
+
+    _, (x, y) = hit
+    needle.scale_hint = scale
+    th, tw = tmpl.shape[:2]
+    return pyscreeze.Point(x + tw // 2, y + th // 2)
+
+
+def _locate_numpy(needle: _Needle, haystack, confidence: float):
+    """
+    无 OpenCV 时的 NumPy 向量化找图，替代 pyscreeze 的逐像素 Python 循环：
+    1. 取模板上 4x4 个采样点，对整张截图做向量化比较，筛出候选位置；
+    2. 对候选窗口（sliding_window_view，不复制整图）计算平均绝对差，
+       不超过 (1 - confidence) * 255 即命中，取差异最小的位置。
+    截图和模板都先转成灰度，比较的数据量只有 RGB 的三分之一。
+    返回 haystack 像素坐标下的中心点，找不到返回 None。
+    """
+    hay = _pil_gray(haystack)
+    tmpl = needle.luma().astype(np.int16)
+
+    nh, nw = tmpl.shape[:2]
+    hay_h, hay_w = hay.shape[:2]
+    if nh > hay_h or nw > hay_w:
+        return None
+    out_h, out_w = hay_h - nh + 1, hay_w - nw + 1
+
+    tol = (1.0 - confidence) * 255
+    # 采样点只做粗筛：单个像素允许比平均误差大得多，避免误杀
+    sample_tol = max(tol * 4, 8)
+    mask = None
+    for dy in np.linspace(0, nh - 1, 4).astype(int):
+        for dx in np.linspace(0, nw - 1, 4).astype(int):
+            window = hay[dy:dy + out_h, dx:dx + out_w]
+            diff = np.abs(window.astype(np.int16) - tmpl[dy, dx])
+            ok = diff <= sample_tol
+            mask = ok if mask is None else (mask & ok)
+            if not mask.any():
+                return None
+
+    ys, xs = np.nonzero(mask)
+    windows = np.lib.stride_tricks.sliding_window_view(hay, (nh, nw))
+    best = None
+    for start in range(0, len(ys), 256):
+        cy = ys[start:start + 256]
+        cx = xs[start:start + 256]
+        chunk = windows[cy, cx].astype(np.int16)
+        mad = np.abs(chunk - tmpl).mean(axis=(1, 2))
+        i = int(np.argmin(mad))
+        if mad[i] <= tol and (best is None or mad[i] < best[0]):
+            best = (mad[i], int(cx[i]), int(cy[i]))
+            if mad[i] == 0:
+                break
+    if best is None:
+        return None
+    return pyscreeze.Point(best[1] + nw // 2, best[2] + nh // 2)
+
+
 def _locate_center_on_screen(
-    img: str,
+    img,
     *,
+    haystack=None,
     confidence: float = 0.9,
     on_warn: Optional[Callable[[str], None]] = None,
 ):
     """
-    兼容 OpenCV/置信度参数不可用的场景：
-    - 优先使用 confidence（更稳定）
+    找图入口：
+    - 已安装 OpenCV 且模板是图片：走灰度 + 降采样的 _locate_center_opencv
+    - 无 OpenCV 但有 NumPy：走向量化的 _locate_numpy
+    - 否则交给 pyscreeze，优先使用 confidence（更稳定）
     - 若环境不支持（常见：未安装 OpenCV），降级为不带 confidence 的匹配并提示一次
+
+    img: 预加载的 _Needle、PIL.Image，或图片路径（每次调用都会 stat 一次）。
+    haystack: 本轮已截好的屏幕图片（PIL.Image，或原生截图得到的灰度 ndarray）。
+    重试循环每轮只截一次屏，不传则现截一张。
     """
-    if not img:
+    if img is None or (isinstance(img, str) and not img):
         return None
 
-    # 如果给的是文件路径（绝对或相对），尽早发现明显的文件缺失问题
-    # 允许用户传入非文件路径（例如某些自定义方式），此时不做存在性校验
-    if any(sep in img for sep in ("/", "\\")) and not os.path.exists(img):
+    if isinstance(img, _Needle):
+        needle = img
+    elif isinstance(img, Image.Image):
+        needle = _Needle(None, img)
+    elif os.path.isfile(img):
+        needle = _load_needle(img)
+    elif any(sep in img for sep in ("/", "\\")):
+        # 如果给的是文件路径（绝对或相对），尽早发现明显的文件缺失问题
         raise StepFailed(f"图片文件不存在: {img}")
-
+    else:
+        # 允许用户传入非文件路径（例如某些自定义方式），原样交给 pyscreeze
+        needle = None
+
+    if haystack is None:
+        haystack = pyautogui.screenshot()
+    if cv2 is not None and needle is not None:
+        return _locate_center_opencv(needle, haystack, confidence)
+    if np is not None and needle is not None:
+        if on_warn:
+            on_warn("未检测到 OpenCV，已使用 NumPy 找图。建议安装 opencv-python 提升速度和稳定性。")
+        return _locate_numpy(needle, haystack, confidence)
+
+    target = needle.image if needle is not None else img
     try:
-        return pyautogui.locateCenterOnScreen(img, confidence=confidence)
-    except Exception as e:
-        # 典型报错：confidence 参数仅在安装 OpenCV 时可用
-        msg = str(e)
-        if "confidence" in msg.lower() or "opencv" in msg.lower():
+        # 统一按灰度匹配：数据量只有彩色的三分之一，原生截图给的也是灰度 ndarray
+        if cv2 is not None:
+            box = pyscreeze.locate(target, haystack, confidence=confidence, grayscale=True)
+        else:
+            # confidence 参数仅在安装 OpenCV 时可用，直接走不带置信度的匹配
             if on_warn:
                 on_warn("检测到环境不支持 confidence/OpenCV，已降级为不带置信度的找图。建议安装 opencv-python 提升稳定性。")
-            try:
-                return pyautogui.locateCenterOnScreen(img)
-            except pyautogui.ImageNotFoundException:
-                return None
-        raise
+            box = pyscreeze.locate(target, haystack, grayscale=True)
+    except _IMAGE_NOT_FOUND:
+        return None
 
+    if box is None:
+        return None
+    return pyscreeze.center(box)
 
-def mouseClick(
-    clickTimes,
-    lOrR,
-    img,
-    reTry,
-    timeout=60,
-    should_stop: Optional[Callable[[], bool]] = None,
-    on_warn: Optional[Callable[[str], None]] = None,
-    scale_x: Optional[float] = None,
-    scale_y: Optional[float] = None,
-):
+
+class _Win32Grabber:
+    """
+    Windows 原生截图：BitBlt 到内存 DC，再用 GetDIBits 直接写进 numpy 缓冲区，不经过 PIL。
+    DC / 位图 / 缓冲区按尺寸复用，返回的数组会在下一次 grab 时被覆盖。
     """
-    安全统一语义：reTry 仅代表“找图重试策略”，不承载“重复点击”语义。
 
-    reTry:
-      - 1: 只尝试一次，找不到则失败
-      - >1: 最多尝试 N 次，找到则点击一次并继续
-      - -1: 无限等待直到首次匹配成功，点击一次并继续
+    def __init__(self):
+        from ctypes import wintypes
+
+        class BITMAPINFOHEADER(ctypes.Structure):
+            _fields_ = [
+                ("biSize", wintypes.DWORD),
+                ("biWidth", wintypes.LONG),
+                ("biHeight", wintypes.LONG),
+                ("biPlanes", wintypes.WORD),
+                ("biBitCount", wintypes.WORD),
+                ("biCompression", wintypes.DWORD),
+                ("biSizeImage", wintypes.DWORD),
+                ("biXPelsPerMeter", wintypes.LONG),
+                ("biYPelsPerMeter", wintypes.LONG),
+                ("biClrUsed", wintypes.DWORD),
+                ("biClrImportant", wintypes.DWORD),
+            ]
+
+        class BITMAPINFO(ctypes.Structure):
+            _fields_ = [("bmiHeader", BITMAPINFOHEADER), ("bmiColors", wintypes.DWORD * 3)]
+
+        self._bitmapinfo_cls = BITMAPINFO
+        self._user32 = user32 = ctypes.WinDLL("user32")
+        self._gdi32 = gdi32 = ctypes.WinDLL("gdi32")
+        # 句柄在 64 位下是指针，必须声明类型，否则会被截断
+        user32.GetDC.argtypes = [wintypes.HWND]
+        user32.GetDC.restype = wintypes.HDC
+        user32.ReleaseDC.argtypes = [wintypes.HWND, wintypes.HDC]
+        user32.GetSystemMetrics.argtypes = [ctypes.c_int]
+        gdi32.CreateCompatibleDC.argtypes = [wintypes.HDC]
+        gdi32.CreateCompatibleDC.restype = wintypes.HDC
+        gdi32.CreateCompatibleBitmap.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int]
+        gdi32.CreateCompatibleBitmap.restype = wintypes.HBITMAP
+        gdi32.SelectObject.argtypes = [wintypes.HDC, wintypes.HGDIOBJ]
+        gdi32.SelectObject.restype = wintypes.HGDIOBJ
+        gdi32.DeleteObject.argtypes = [wintypes.HGDIOBJ]
+        gdi32.DeleteDC.argtypes = [wintypes.HDC]
+        gdi32.BitBlt.argtypes = [
+            wintypes.HDC, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+            wintypes.HDC, ctypes.c_int, ctypes.c_int, wintypes.DWORD,
+        ]
+        gdi32.GetDIBits.argtypes = [
+            wintypes.HDC, wintypes.HBITMAP, wintypes.UINT, wintypes.UINT,
+            ctypes.c_void_p, ctypes.c_void_p, wintypes.UINT,
+        ]
 
-    timeout: 超时时间(秒)，默认60秒。防止无限卡死。
+        self._size = None
+        self._mem_dc = None
+        self._bitmap = None
+        self._bmi = None
+        self._buf = None
+
+    def _realloc(self, screen_dc, w: int, h: int):
+        gdi32 = self._gdi32
+        if self._bitmap:
+            gdi32.DeleteObject(self._bitmap)
+        if self._mem_dc:
+            gdi32.DeleteDC(self._mem_dc)
+        self._mem_dc = gdi32.CreateCompatibleDC(screen_dc)
+        self._bitmap = gdi32.CreateCompatibleBitmap(screen_dc, w, h)
+        gdi32.SelectObject(self._mem_dc, self._bitmap)
+
+        bmi = self._bitmapinfo_cls()
+        bmi.bmiHeader.biSize = ctypes.sizeof(bmi.bmiHeader)
+        bmi.bmiHeader.biWidth = w
+        bmi.bmiHeader.biHeight = -h  # 负数表示自上而下
+        bmi.bmiHeader.biPlanes = 1
+        bmi.bmiHeader.biBitCount = 32
+        bmi.bmiHeader.biCompression = 0  # BI_RGB
+        self._bmi = bmi
+        self._buf = np.empty((h, w, 4), np.uint8)
+        self._size = (w, h)
+
+    def grab(self, region_px=None):
+        if region_px:
+            x, y, w, h = region_px
+        else:
+            x, y = 0, 0
+            w, h = self._user32.GetSystemMetrics(0), self._user32.GetSystemMetrics(1)
+
+        screen_dc = self._user32.GetDC(None)
+        try:
+            if self._size != (w, h):
+                self._realloc(screen_dc, w, h)
+            # SRCCOPY | CAPTUREBLT（包含分层窗口）
+            if not self._gdi32.BitBlt(self._mem_dc, 0, 0, w, h, screen_dc, x, y, 0x00CC0020 | 0x40000000):
+                raise OSError("BitBlt failed")
+            if not self._gdi32.GetDIBits(
+                self._mem_dc, self._bitmap, 0, h, self._buf.ctypes.data, ctypes.byref(self._bmi), 0
+            ):
+                raise OSError("GetDIBits failed")
+        finally:
+            self._user32.ReleaseDC(None, screen_dc)
+        return self._buf
+
+
+def _screenshot_quartz(region_px=None):
+    """macOS 原生截图：CGDisplayCreateImage 的像素数据直接包成 ndarray（BGRA）。"""
+    image = Quartz.CGDisplayCreateImage(Quartz.CGMainDisplayID())
+    if image is None:
+        return None
+    width = Quartz.CGImageGetWidth(image)
+    height = Quartz.CGImageGetHeight(image)
+    bytes_per_row = Quartz.CGImageGetBytesPerRow(image)
+    data = Quartz.CGDataProviderCopyData(Quartz.CGImageGetDataProvider(image))
+    frame = np.frombuffer(data, np.uint8).reshape(height, bytes_per_row // 4, 4)[:, :width]
+    if region_px:
+        x, y, w, h = region_px
+        frame = frame[y:y + h, x:x + w]
+    return frame
+
+
+def _screenshot_mss(region_px=None):
+    """通用兜底：mss 截图（BGRA）。mss 实例绑定创建它的线程，因此按线程缓存。"""
+    sct = getattr(_mss_local, "sct", None)
+    if sct is None or sct not in _mss_instances:
+        sct = _mss_local.sct = mss.mss()
+        with _mss_lock:
+            _mss_instances.add(sct)
+    if region_px:
+        x, y, w, h = region_px
+        monitor = {"left": x, "top": y, "width": w, "height": h}
+    else:
+        # monitors[0] 是所有显示器拼成的整个虚拟屏幕（monitors[1] 只有第一块屏）；
+        # 主屏位于左上角时，帧内坐标与屏幕坐标一致
+        monitor = sct.monitors[0]
+    return np.asarray(sct.grab(monitor))
+
+
+def _release_screen_grabbers():
+    """关闭所有线程创建过的 mss 实例；任务结束时作为最后一个任务排到找图线程上执行。"""
+    with _mss_lock:
+        instances = list(_mss_instances)
+        _mss_instances.clear()
+    for sct in instances:
+        try:
+            sct.close()
+        except Exception:
+            pass
+
+
+_mss_local = threading.local()
+# 已创建且未关闭的 mss 实例；线程里缓存的实例不在其中时说明已被释放，需要重建
+_mss_instances = set()
+_mss_lock = threading.Lock()
+_win32_grabber = None
+# 原生截图失败后（锁屏、UAC 弹窗、区域超出屏幕等）暂停这么久改走 pyautogui，之后再重试（秒）
+_FAST_SCREENSHOT_COOLDOWN = 2.0
+_fast_screenshot_retry_at = 0.0
+
+
+def _fast_screenshot(region_px=None):
     """
-    start_time = time.time()
+    平台原生截图，直接得到 BGRA ndarray（Windows: BitBlt，macOS: Quartz，其他平台: mss），
+    省掉 pyautogui -> PIL -> ndarray 的多次拷贝。平台不支持或截图失败（冷却期内）时返回 None。
+    """
+    global _win32_grabber, _fast_screenshot_retry_at
+    if np is None or time.monotonic() < _fast_screenshot_retry_at:
+        return None
+    try:
+        if sys.platform == "win32":
+            if _win32_grabber is None:
+                _win32_grabber = _Win32Grabber()
+            return _win32_grabber.grab(region_px)
+        if _is_macos():
+            # mss 在 macOS 上按逻辑坐标取区域，与像素坐标不一致，这里只用 Quartz
+            return _screenshot_quartz(region_px) if Quartz is not None else None
+        if mss is not None:
+            return _screenshot_mss(region_px)
+    except Exception:
+        # 多半是暂时性的失败，不永久关闭原生截图，冷却后再试
+        _fast_screenshot_retry_at = time.monotonic() + _FAST_SCREENSHOT_COOLDOWN
+    return None
+
 
-    # 规范化 reTry
+# 灰度截图缓冲区，按尺寸复用，避免每轮重试都分配一整屏的数组
+_haystack_gray = None
+
+
+def _grab_haystack(region_px=None):
+    """
+    截一帧用于找图：有 OpenCV 且原生截图可用时直接返回灰度 ndarray，否则返回 PIL 截图。
+    灰度结果写在共享缓冲区里，下一次截图会覆盖；找图在单个后台线程上串行执行，所以是安全的。
+    """
+    global _haystack_gray
+    if cv2 is not None:
+        frame = _fast_screenshot(region_px)
+        if frame is not None:
+            shape = frame.shape[:2]
+            if _haystack_gray is None or _haystack_gray.shape != shape:
+                _haystack_gray = np.empty(shape, np.uint8)
+            return cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY, dst=_haystack_gray)
+    return pyautogui.screenshot(region=region_px)
+
+
+def _grab_region_and_locate(img, region_px, on_warn):
+    """截取 region_px（像素坐标，None 为整屏）并找图，返回相对该区域的中心点。"""
+    haystack = _grab_haystack(region_px)
+    try:
+        return _locate_center_on_screen(img, haystack=haystack, on_warn=on_warn)
+    except _IMAGE_NOT_FOUND:
+        return None
+
+
+def _last_loc_roi(needle: _Needle, region_px):
+    """上次命中点周围 3w×3h 的截图区域（像素坐标，裁剪到 region/屏幕内）；放不下模板时返回 None。"""
+    cx, cy = needle.last_loc
+    scale = needle.scale_hint or 1.0
+    w, h = needle.size()
+    w, h = int(w * scale), int(h * scale)
+    if region_px:
+        bx, by, bw, bh = region_px
+    else:
+        screen_w, screen_h, scale_x, scale_y = _get_screen_scale()
+        if not (screen_w and screen_h):
+            # 屏幕尺寸测量失败：不知道边界就不裁剪 ROI，直接回到整屏查找
+            return None
+        # 缩放未知时按 1:1 处理（截图与逻辑坐标一致的最常见情况）
+        bx, by, bw, bh = 0, 0, int(screen_w * (scale_x or 1.0)), int(screen_h * (scale_y or 1.0))
+    x0 = max(bx, int(cx - 1.5 * w))
+    y0 = max(by, int(cy - 1.5 * h))
+    x1 = min(bx + bw, int(cx + 1.5 * w))
+    y1 = min(by + bh, int(cy + 1.5 * h))
+    if x1 - x0 < w or y1 - y0 < h:
+        return None
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def _grab_and_locate(img, region_px, on_warn):
+    """
+    截一次屏并找图；可直接调用，也可提交到后台线程执行。
+    模板上次命中过时先只截取命中点附近的小区域，找不到再回到整个搜索区域。
+    返回相对 region_px 左上角的中心点。
+    """
+    origin_x, origin_y = region_px[:2] if region_px else (0, 0)
+    needle = img if isinstance(img, _Needle) else None
+
+    if needle is not None and needle.last_loc is not None:
+        roi = _last_loc_roi(needle, region_px)
+        location = _grab_region_and_locate(needle, roi, on_warn) if roi is not None else None
+        if location is not None:
+            needle.last_loc = (location.x + roi[0], location.y + roi[1])
+            return pyscreeze.Point(needle.last_loc[0] - origin_x, needle.last_loc[1] - origin_y)
+        needle.last_loc = None
+
+    location = _grab_region_and_locate(img, region_px, on_warn)
+    if needle is not None and location is not None:
+        needle.last_loc = (location.x + origin_x, location.y + origin_y)
+    return location
+
+
+def _submit_task(executor: Optional[ThreadPoolExecutor], fn, *args) -> Future:
+    """
+    把截图相关的操作提交到找图线程。有线程池时后台执行；
+    没有线程池时同步执行，返回已完成的 Future。线程池已关闭时抛出 TaskStopped。
+    """
+    if executor is None:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    try:
+        return executor.submit(fn, *args)
+    except RuntimeError:
+        # 线程池已在 stop() 中关闭
+        raise TaskStopped("任务已停止")
+
+
+def _submit_locate(executor: Optional[ThreadPoolExecutor], img, region_px, on_warn) -> Future:
+    """提交一次"截图+找图"，让它与调用方的 sleep 重叠。"""
+    return _submit_task(executor, _grab_and_locate, img, region_px, on_warn)
+
+
+def _grab_screen_image():
+    """整屏截图为 PIL.Image (RGB)；优先走原生截图，拷贝出独立的像素数据。"""
+    frame = _fast_screenshot()
+    if frame is not None:
+        # BGRA -> RGB；ascontiguousarray 会拷贝，原生截图的复用缓冲区可以继续被覆盖
+        return Image.fromarray(np.ascontiguousarray(frame[:, :, 2::-1]))
+    return pyautogui.screenshot()
+
+
+# 截图写盘：所有截图由同一个线程串行写入；排队中（含正在写）的截图最多这么多张，
+# 满了调用方就等一等，整屏截图不会在内存里越积越多
+_SAVE_QUEUE_LIMIT = 2
+_save_slots = threading.BoundedSemaphore(_SAVE_QUEUE_LIMIT)
+_save_executor = None
+_save_executor_lock = threading.Lock()
+
+
+def _write_image(image, filename: str, on_error: Optional[Callable[[str], None]]):
+    """写盘线程：先写到同目录的临时文件再 os.replace，目标文件要么是旧图要么是完整的新图。"""
+    root, ext = os.path.splitext(filename)
+    # 写入是串行的，固定的临时文件名不会被同时写
+    tmp = f"{root}.saving{ext}"
+    try:
+        image.save(tmp)
+        os.replace(tmp, filename)
+    except Exception as e:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        if on_error:
+            on_error(f"截图保存失败: {filename} ({e})")
+    finally:
+        _save_slots.release()
+
+
+def _save_image_async(image, filename: str, on_error: Optional[Callable[[str], None]] = None):
+    """
+    交给后台写盘线程编码并写入图片，自动化流程不必等 PNG 压缩和磁盘 IO。
+    已有 _SAVE_QUEUE_LIMIT 张在排队时阻塞到有空位。
+    写盘线程属于 ThreadPoolExecutor，程序退出前会等排队的截图写完。
+    """
+    global _save_executor
+    with _save_executor_lock:
+        if _save_executor is None:
+            _save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rpa-save-screenshot")
+    _save_slots.acquire()
+    try:
+        _save_executor.submit(_write_image, image, filename, on_error)
+    except BaseException:
+        _save_slots.release()
+        raise
+
+
+def _wait_locate(future: Future, stop_event: Optional[threading.Event] = None):
+    """
+    等待找图结果。Future 完成或 stop_event（_StopSignal）置位时立即唤醒，不按固定间隔轮询；
+    停止时取消还在排队的找图并抛出 TaskStopped，不等正在进行的那一次截图+找图结束。
+    """
+    add_waiter = getattr(stop_event, "add_waiter", None)
+    if add_waiter is not None and not future.done():
+        woke = threading.Event()
+        future.add_done_callback(lambda _f: woke.set())
+        add_waiter(woke)
+        try:
+            woke.wait()
+        finally:
+            stop_event.remove_waiter(woke)
+    if stop_event is not None and stop_event.is_set():
+        future.cancel()
+        raise TaskStopped("任务已停止")
+    try:
+        return future.result()
+    except CancelledError:
+        raise TaskStopped("任务已停止")
+
+
+# 有限次重试时两次尝试之间的间隔（秒）
+_RETRY_INTERVAL = 0.1
+
+
+def _normalize_retry(reTry) -> int:
+    """reTry 规范化：-1 表示无限等待，其余非正数/非法值按 1 处理。"""
     try:
         reTry = int(reTry)
     except Exception:
-        reTry = 1
-
+        return 1
     if reTry == 0 or reTry < -1:
-        reTry = 1
+        return 1
+    return reTry
 
-    def _check_timeout():
-        if timeout and (time.time() - start_time > timeout):
-            raise StepFailed(f"等待图片超时 ({timeout}秒): {img}")
 
-    # reTry=-1：无限等待直到成功（但仍受 timeout/stop 影响）
+def _poll_locate(
+    img,
+    reTry: int,
+    timeout,
+    stop_event: Optional[threading.Event],
+    on_warn: Optional[Callable[[str], None]],
+    region_px,
+    executor: Optional[ThreadPoolExecutor],
+    on_log: Optional[Callable[[str], None]] = None,
+):
+    """
+    按 reTry 语义轮询"截图+找图"，返回相对 region_px 的命中位置。
+
+    reTry=-1 时无限等待，间隔从 5ms 起按 1.5 倍退避到 100ms；否则最多尝试 reTry 次，间隔 100ms。
+    上一次截图+找图比间隔短时，下一次提前提交到 executor，与 sleep 重叠；
+    比间隔长时等 sleep 结束再提交，找图线程两次之间总有空闲。
+    超时或次数用尽抛出 StepFailed，stop 抛出 TaskStopped。
+    on_log: 可选的日志回调；未命中时最多每 2 秒输出一次进度，而不是每轮都输出。
+    """
+    # 热循环里用到的全局/属性查找提前绑定到局部变量
+    _time = time.time
+    _submit = _submit_locate
+    _wait = _wait_locate
+
+    start = _time()
+    deadline = start + timeout if timeout else None
+    next_log = start + _SEARCH_LOG_INTERVAL
     if reTry == -1:
-        while True:
-            if should_stop and should_stop():
-                raise TaskStopped("任务已停止")
-            _check_timeout()
+        remaining = math.inf
+        delay, backoff = _POLL_DELAY_MIN, _POLL_BACKOFF
+    else:
+        remaining = reTry
+        delay, backoff = _RETRY_INTERVAL, 1.0
 
-            try:
-                location = _locate_center_on_screen(img, on_warn=on_warn)
-            except pyautogui.ImageNotFoundException:
-                location = None
+    last_cost = 0.0
 
-            if location is not None:
-                nx, ny = _normalize_xy_for_macos_retina(
-                    location.x,
-                    location.y,
-                    scale_x=scale_x,
-                    scale_y=scale_y,
-                )
-                pre_app = _get_frontmost_app_name()
-                pyautogui.click(
-                    int(round(nx)),
-                    int(round(ny)),
-                    clicks=clickTimes,
-                    interval=0.2,
-                    duration=0.2,
-                    button=lOrR,
-                )
-                post_app = _get_frontmost_app_name()
-                # 如果本次点击导致前台应用切换，常见现象是“第一次点击只激活窗口”
-                # 这里做一次无延迟的补偿点击，尽量让控件动作生效。
-                if pre_app and post_app and pre_app != post_app:
-                    pyautogui.click(
-                        int(round(nx)),
-                        int(round(ny)),
-                        clicks=clickTimes,
-                        interval=0.2,
-                        duration=0.2,
-                        button=lOrR,
-                    )
-                return
+    def submit():
+        # 只在找图线程空闲时提交，所以"提交 -> 完成"就是这一次截图+找图的耗时
+        submitted = _time()
 
-            _cancellable_sleep(0.1, should_stop)
+        def record_cost(_future):
+            nonlocal last_cost
+            last_cost = _time() - submitted
 
-    # reTry>=1：有限次尝试
-    for attempt in range(reTry):
-        if should_stop and should_stop():
-            raise TaskStopped("任务已停止")
-        _check_timeout()
+        future = _submit(executor, img, region_px, on_warn)
+        future.add_done_callback(record_cost)
+        return future
 
-        try:
-            location = _locate_center_on_screen(img, on_warn=on_warn)
-        except pyautogui.ImageNotFoundException:
-            location = None
+    pending = None
+    try:
+        while True:
+            if stop_event is not None and stop_event.is_set():
+                raise TaskStopped("任务已停止")
+            if deadline is not None and _time() > deadline:
+                raise StepFailed(f"等待图片超时 ({timeout}秒): {img}")
 
-        if location is not None:
-            nx, ny = _normalize_xy_for_macos_retina(
-                location.x,
-                location.y,
-                scale_x=scale_x,
-                scale_y=scale_y,
-            )
-            pre_app = _get_frontmost_app_name()
-            pyautogui.click(
-                int(round(nx)),
-                int(round(ny)),
-                clicks=clickTimes,
-                interval=0.2,
-                duration=0.2,
-                button=lOrR,
-            )
-            post_app = _get_frontmost_app_name()
-            if pre_app and post_app and pre_app != post_app:
-                pyautogui.click(
-                    int(round(nx)),
-                    int(round(ny)),
-                    clicks=clickTimes,
-                    interval=0.2,
-                    duration=0.2,
-                    button=lOrR,
-                )
-            return
+            if pending is None:
+                pending = submit()
+            location = _wait(pending, stop_event)
+            pending = None
+            if location is not None:
+                return location
+
+            remaining -= 1
+            if remaining <= 0:
+                raise StepFailed(f"未找到匹配图片: {img}")
+            now = _time()
+            if on_log is not None and now >= next_log:
+                on_log(f"仍在查找图片 (已等待 {now - start:.0f} 秒): {img}")
+                next_log = now + _SEARCH_LOG_INTERVAL
+
+            # 上一次截图+找图比 sleep 短：下一轮先提交，与 sleep 重叠，sleep 结束前就能做完；
+            # 否则 sleep 完再提交，避免找图线程一次接一次地满载运行
+            if last_cost < delay:
+                pending = submit()
+            _cancellable_sleep(delay if deadline is None else max(0.0, min(delay, deadline - now)), stop_event)
+            delay = min(delay * backoff, _POLL_DELAY_MAX)
+    finally:
+        # 停止/超时时取消还在排队的预提交
+        if pending is not None:
+            pending.cancel()
+
+
+def mouseClick(
+    clickTimes,
+    lOrR,
+    img,
+    reTry,
+    timeout=60,
+    stop_event: Optional[threading.Event] = None,
+    on_warn: Optional[Callable[[str], None]] = None,
+    scale_x: Optional[float] = None,
+    scale_y: Optional[float] = None,
+    region=None,
+    executor: Optional[ThreadPoolExecutor] = None,
+    duration: float = 0.0,
+    interval: float = 0.0,
+    on_log: Optional[Callable[[str], None]] = None,
+):
+    """
+    安全统一语义：reTry 仅代表“找图重试策略”，不承载“重复点击”语义。
 
-        if attempt < reTry - 1:
-            _cancellable_sleep(0.1, should_stop)
+    reTry:
+      - 1: 只尝试一次，找不到则失败
+      - >1: 最多尝试 N 次，找到则点击一次并继续
+      - -1: 无限等待直到首次匹配成功，点击一次并继续（轮询间隔 5ms 起按 1.5 倍退避到 100ms）
 
-    raise StepFailed(f"未找到匹配图片: {img}")
+    timeout: 超时时间(秒)，默认60秒。防止无限卡死。
+    region: 可选的搜索区域 (x, y, w, h)，屏幕坐标；只截取并搜索该区域。
+    executor: 可选的后台线程池；找图够快时下一轮截图+找图会提前提交，与本轮 sleep 重叠。
+    duration/interval: 鼠标移动耗时、多次点击间隔(秒)。默认 0（瞬移、无间隔）；
+      需要模拟人工移动轨迹时再按任务单独配置。
+    on_log: 可选的日志回调，长时间未找到图片时节流输出进度。
+    """
+    region_px = _region_to_pixels(region, scale_x, scale_y)
+    location = _poll_locate(
+        img, _normalize_retry(reTry), timeout, stop_event, on_warn, region_px, executor, on_log
+    )
+
+    origin_x, origin_y = region_px[:2] if region_px else (0, 0)
+    nx, ny = _normalize_xy_to_screen(
+        location.x + origin_x,
+        location.y + origin_y,
+        scale_x=scale_x,
+        scale_y=scale_y,
+    )
+    x, y = int(round(nx)), int(round(ny))
+    pre_app = _get_frontmost_app_name()
+    pyautogui.click(x, y, clicks=clickTimes, interval=interval, duration=duration, button=lOrR)
+    post_app = _get_frontmost_app_name()
+    # 如果本次点击导致前台应用切换，常见现象是“第一次点击只激活窗口”
+    # 这里稍等窗口拿到焦点后做一次补偿点击，尽量让控件动作生效。
+    if pre_app and post_app and pre_app != post_app:
+        _cancellable_sleep(0.05, stop_event)
+        pyautogui.click(x, y, clicks=clickTimes, interval=interval, duration=duration, button=lOrR)
 
 
 def mouseMove(
     img,
     reTry,
     timeout=60,
-    should_stop: Optional[Callable[[], bool]] = None,
+    stop_event: Optional[threading.Event] = None,
     on_warn: Optional[Callable[[str], None]] = None,
     scale_x: Optional[float] = None,
     scale_y: Optional[float] = None,
+    region=None,
+    executor: Optional[ThreadPoolExecutor] = None,
+    duration: float = 0.0,
+    on_log: Optional[Callable[[str], None]] = None,
 ):
     """
     鼠标悬停（移动但不点击）
+
+    reTry/timeout/region/executor/duration/on_log: 同 mouseClick。
     """
-    start_time = time.time()
+    region_px = _region_to_pixels(region, scale_x, scale_y)
+    location = _poll_locate(
+        img, _normalize_retry(reTry), timeout, stop_event, on_warn, region_px, executor, on_log
+    )
+
+    origin_x, origin_y = region_px[:2] if region_px else (0, 0)
+    nx, ny = _normalize_xy_to_screen(
+        location.x + origin_x,
+        location.y + origin_y,
+        scale_x=scale_x,
+        scale_y=scale_y,
+    )
+    pyautogui.moveTo(int(round(nx)), int(round(ny)), duration=duration)
+
+
+def _parse_region(value):
+    """把 "x,y,w,h" 字符串或 4 元素序列解析为 int 元组；为空或格式不对返回 None。"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.replace("，", ",").split(",")
     try:
-        reTry = int(reTry)
-    except Exception:
-        reTry = 1
+        region = tuple(int(float(v)) for v in value)
+    except (TypeError, ValueError):
+        return None
+    if len(region) != 4 or region[2] <= 0 or region[3] <= 0:
+        return None
+    return region
 
-    if reTry == 0 or reTry < -1:
-        reTry = 1
 
-    def _check_timeout():
-        if timeout and (time.time() - start_time > timeout):
-            raise StepFailed(f"等待图片超时 ({timeout}秒): {img}")
+# 需要找图的指令类型：左键单击、左键双击、右键单击、鼠标悬停
+_IMAGE_CMD_TYPES = frozenset({1, 2, 3, 8})
 
-    if reTry == -1:
-        while True:
-            if should_stop and should_stop():
-                raise TaskStopped("任务已停止")
-            _check_timeout()
 
-            try:
-                location = _locate_center_on_screen(img, on_warn=on_warn)
-            except pyautogui.ImageNotFoundException:
-                location = None
+# 组合键别名：cmd/control/option 等
+_KEY_ALIAS = {
+    "cmd": "command",
+    "command": "command",
+    "ctl": "ctrl",
+    "control": "ctrl",
+    "option": "alt",
+    "win": "winleft",
+    "windows": "winleft",
+    "super": "winleft",
+}
 
-            if location is not None:
-                nx, ny = _normalize_xy_for_macos_retina(
-                    location.x,
-                    location.y,
-                    scale_x=scale_x,
-                    scale_y=scale_y,
-                )
-                pyautogui.moveTo(int(round(nx)), int(round(ny)), duration=0.2)
-                return
 
-            _cancellable_sleep(0.1, should_stop)
+def _parse_hotkey(value) -> Tuple[str, ...]:
+    """'Ctrl + S' -> ('ctrl', 's')，并做别名转换。"""
+    keys = (k.strip() for k in str(value).lower().split('+'))
+    return tuple(_KEY_ALIAS.get(k, k) for k in keys if k)
+
+
+def _parse_arg(cmd_type, value: str):
+    """
+    预解析指令参数：等待 -> float，滚轮 -> int，系统按键 -> 按键元组。
+    无法解析或不需要解析时返回 None，执行时再按原始字符串处理（并报出原来的错误）。
+    """
+    try:
+        if cmd_type == 5:
+            return float(value)
+        if cmd_type == 6:
+            return int(value)
+    except (TypeError, ValueError):
+        return None
+    if cmd_type == 7:
+        return _parse_hotkey(value)
+    return None
 
-    for attempt in range(reTry):
-        if should_stop and should_stop():
-            raise TaskStopped("任务已停止")
-        _check_timeout()
 
+@dataclass
+class Task:
+    """
+    一条已解析的指令。提交任务时由 dict 转换一次，执行循环里直接读属性，
+    不再每步做多次 dict.get。
+    cmd_type 使用 int（旧配置里的 1.0 等浮点值会被转换）。
+    arg 为预解析的参数（见 _parse_arg），循环执行时不再重复 float()/int()/split。
+    """
+    cmd_type: int
+    value: str
+    retry: int = 1
+    region: Optional[Tuple[int, int, int, int]] = None
+    duration: float = 0.0
+    interval: float = 0.0
+    # 输入文本时直接发按键事件（仅 ASCII）；默认走剪贴板粘贴，不受输入法影响
+    type_keys: bool = False
+    arg: object = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Task":
+        cmd_type = data.get("type")
         try:
-            location = _locate_center_on_screen(img, on_warn=on_warn)
-        except pyautogui.ImageNotFoundException:
-            location = None
+            cmd_type = int(float(cmd_type))
+        except (TypeError, ValueError):
+            pass  # 保留原值，执行时按未知指令类型报错
 
-        if location is not None:
-            nx, ny = _normalize_xy_for_macos_retina(
-                location.x,
-                location.y,
-                scale_x=scale_x,
-                scale_y=scale_y,
-            )
-            pyautogui.moveTo(int(round(nx)), int(round(ny)), duration=0.2)
-            return
+        try:
+            retry = int(data.get("retry", 1))
+        except (TypeError, ValueError):
+            retry = 1
 
-        if attempt < reTry - 1:
-            _cancellable_sleep(0.1, should_stop)
+        value = str(data.get("value", ""))
+        return cls(
+            cmd_type=cmd_type,
+            value=value,
+            retry=retry,
+            region=_parse_region(data.get("region")),
+            duration=float(data.get("duration", 0) or 0),
+            interval=float(data.get("interval", 0) or 0),
+            type_keys=bool(data.get("type_keys", False)),
+            arg=_parse_arg(cmd_type, value),
+        )
 
-    raise StepFailed(f"未找到匹配图片: {img}")
 
 class RPAEngine:
     def __init__(self):
         self.is_running = False
-        self.stop_requested = False
+        # stop() 置位后所有等待（sleep/找图）立即唤醒
+        self._stop_event = _StopSignal()
+        # 后台找图线程池：仅在 run_tasks 期间存在
+        self._executor = None
+        # 上一次 run_tasks 的线程池：停止时可能还有一次截图没做完，下次开始前等它退出
+        self._retired_executor = None
+        # 图片路径 -> 预加载的 _Needle（run_tasks 开始时填充）
+        self._needle_cache = {}
+        # 以下为单次 run_tasks 的运行参数，由 run_tasks 设置
+        self._on_warn = None
+        self._callback_msg = None
+        self._set_clipboard = None
+        self._scale_x = None
+        self._scale_y = None
+        # 指令类型 -> 处理方法；每个方法执行一步并返回要输出的日志
+        self._dispatch = {
+            1: self._left_click,
+            2: self._left_double_click,
+            3: self._right_click,
+            4: self._type_text,
+            5: self._wait,
+            6: self._scroll,
+            7: self._hotkey,
+            8: self._hover,
+            9: self._screenshot,
+        }
 
     def stop(self):
-        self.stop_requested = True
+        self._stop_event.set()
         self.is_running = False
 
-    def run_tasks(self, tasks, loop_forever=False, callback_msg=None):
+    def _preload_needles(self, tasks):
+        """提交时预加载所有找图步骤的模板图片；有文件缺失立即报错。"""
+        self._needle_cache = {}
+        for task in tasks:
+            if task.cmd_type not in _IMAGE_CMD_TYPES:
+                continue
+            path = task.value
+            if not path or path in self._needle_cache:
+                continue
+            if os.path.isfile(path) or any(sep in path for sep in ("/", "\\")):
+                self._needle_cache[path] = _load_needle(path)
+
+    def _click(self, task: Task, needle, clicks: int, button: str):
+        mouseClick(
+            clicks,
+            button,
+            needle,
+            task.retry,
+            stop_event=self._stop_event,
+            on_warn=self._on_warn,
+            on_log=self._callback_msg,
+            scale_x=self._scale_x,
+            scale_y=self._scale_y,
+            region=task.region,
+            executor=self._executor,
+            duration=task.duration,
+            interval=task.interval,
+        )
+
+    def _left_click(self, task: Task, needle) -> str:
+        self._click(task, needle, 1, "left")
+        return f"单击左键: {task.value}"
+
+    def _left_double_click(self, task: Task, needle) -> str:
+        self._click(task, needle, 2, "left")
+        return f"双击左键: {task.value}"
+
+    def _right_click(self, task: Task, needle) -> str:
+        self._click(task, needle, 1, "right")
+        return f"右键单击: {task.value}"
+
+    def _type_text(self, task: Task, needle) -> str:
+        text = str(task.value)
+        if task.type_keys and text.isascii():
+            # 勾选了按键输入：直接发按键事件，不覆盖用户的剪贴板内容。
+            # 目标窗口开着中文输入法时按键会被输入法截获，所以只作为可选项
+            pyautogui.write(text, interval=0)
+            _cancellable_sleep(0.05, self._stop_event)
+        else:
+            # 默认通过剪贴板粘贴：中文等非 ASCII 文本也只能这样输入
+            self._set_clipboard(text)
+            if _is_macos():
+                pyautogui.hotkey("command", "v")
+            else:
+                pyautogui.hotkey("ctrl", "v")
+            # 剪贴板写入是同步完成的，这里只需给目标应用处理粘贴的时间
+            _cancellable_sleep(0.05, self._stop_event)
+        return f"输入文本: {task.value}"
+
+    def _wait(self, task: Task, needle) -> str:
+        sleep_time = task.arg if task.arg is not None else float(task.value)
+        _cancellable_sleep(sleep_time, self._stop_event)
+        return f"等待 {sleep_time} 秒"
+
+    def _scroll(self, task: Task, needle) -> str:
+        scroll_val = task.arg if task.arg is not None else int(task.value)
+        pyautogui.scroll(scroll_val)
+        return f"滚轮滑动 {scroll_val}"
+
+    def _hotkey(self, task: Task, needle) -> str:
+        keys = task.arg if task.arg is not None else _parse_hotkey(task.value)
+        pyautogui.hotkey(*keys)
+        return f"按键组合: {task.value}"
+
+    def _hover(self, task: Task, needle) -> str:
+        mouseMove(
+            needle,
+            task.retry,
+            stop_event=self._stop_event,
+            on_warn=self._on_warn,
+            on_log=self._callback_msg,
+            scale_x=self._scale_x,
+            scale_y=self._scale_y,
+            region=task.region,
+            executor=self._executor,
+            duration=task.duration,
+        )
+        return f"鼠标悬停: {task.value}"
+
+    def _screenshot(self, task: Task, needle) -> str:
+        path = str(task.value)
+        # 如果是目录，自动拼接时间戳文件名；带上毫秒，循环执行时同一秒内的多张截图不会重名
+        if os.path.isdir(path):
+            now = time.time()
+            timestamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(now)) + f"_{int(now * 1000) % 1000:03d}"
+            filename = os.path.join(path, f"screenshot_{timestamp}.png")
+        else:
+            # 兼容旧逻辑：如果用户直接输入了带文件名的路径
+            filename = path
+            if not filename.endswith(('.png', '.jpg', '.bmp')):
+                filename += '.png'
+
+        # 截图放到找图线程上做（原生截图的句柄/缓冲区只在那里使用），编码写盘交给后台线程
+        future = _submit_task(self._executor, _grab_screen_image)
+        image = _wait_locate(future, self._stop_event)
+        _save_image_async(image, filename, self._callback_msg)
+        return f"截图保存至: {filename}"
+
+    def run_tasks(self, tasks, loop_forever=False, callback_msg=None, set_clipboard=None):
         """
-        tasks: list of dict, format:
+        set_clipboard: 写剪贴板的函数（输入非 ASCII 文本时使用），默认 pyperclip.copy；
+          GUI 下由 WorkerThread 提供进程内的 QClipboard 实现。
+        tasks: list of Task，或兼容旧格式的 list of dict:
         [
-            {"type": 1.0, "value": "1.png", "retry": 1},
+            {"type": 1, "value": "1.png", "retry": 1},
+            {"type": 1, "value": "2.png", "retry": 1, "region": [0, 0, 800, 600]},
+            {"type": 2, "value": "3.png", "retry": 1, "duration": 0.2, "interval": 0.2},
             ...
         ]
         """
+        tasks = [t if isinstance(t, Task) else Task.from_dict(t) for t in tasks]
         self.is_running = True
-        self.stop_requested = False
-
-        def should_stop() -> bool:
-            return bool(self.stop_requested)
+        if set_clipboard is None:
+            set_clipboard = pyperclip.copy
+        stop_event = self._stop_event
+        stop_event.clear()
+        # 上一轮停止时没等找图线程做完；先等它退出（连同释放截图资源），避免两个线程同时截图
+        retired, self._retired_executor = self._retired_executor, None
+        if retired is not None:
+            retired.shutdown(wait=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rpa-locate")
 
         # 用于输出一次性的降级提示（例如 OpenCV 不可用）
         warned_messages = set()
@@ -360,139 +1453,40 @@ class RPAEngine:
             if callback_msg:
                 callback_msg(f"提示: {msg}")
 
-        try:
-            screen_w, screen_h = pyautogui.size()
-        except Exception:
-            screen_w, screen_h = None, None
-        try:
-            shot = pyautogui.screenshot()
-            shot_w, shot_h = shot.size
-        except Exception:
-            shot_w, shot_h = None, None
-
-        scale_x = (shot_w / screen_w) if (shot_w and screen_w) else None
-        scale_y = (shot_h / screen_h) if (shot_h and screen_h) else None
+        _, _, self._scale_x, self._scale_y = _get_screen_scale()
+        self._on_warn = warn_once
+        self._callback_msg = callback_msg
+        self._set_clipboard = set_clipboard
 
         try:
+            try:
+                self._preload_needles(tasks)
+            except StepFailed as e:
+                if callback_msg:
+                    callback_msg(f"任务校验失败: {e}")
+                return
+            needle_cache = self._needle_cache
+            dispatch = self._dispatch
+
             while True:
                 for idx, task in enumerate(tasks):
-                    if self.stop_requested:
+                    if stop_event.is_set():
                         if callback_msg: callback_msg("任务已停止")
                         return
 
-                    cmd_type = task.get("type")
-                    cmd_value = task.get("value")
-                    retry = task.get("retry", 1)
+                    cmd_type = task.cmd_type
+                    cmd_value = task.value
+                    needle = needle_cache.get(cmd_value, cmd_value)
 
                     if callback_msg:
                         callback_msg(f"执行步骤 {idx+1}: 类型={cmd_type}, 内容={cmd_value}")
 
+                    handler = dispatch.get(cmd_type)
                     try:
-                        if cmd_type == 1.0: # 单击左键
-                            mouseClick(
-                                1,
-                                "left",
-                                cmd_value,
-                                retry,
-                                should_stop=should_stop,
-                                on_warn=warn_once,
-                                scale_x=scale_x,
-                                scale_y=scale_y,
-                            )
-                            if callback_msg: callback_msg(f"单击左键: {cmd_value}")
-                        
-                        elif cmd_type == 2.0: # 双击左键
-                            mouseClick(
-                                2,
-                                "left",
-                                cmd_value,
-                                retry,
-                                should_stop=should_stop,
-                                on_warn=warn_once,
-                                scale_x=scale_x,
-                                scale_y=scale_y,
-                            )
-                            if callback_msg: callback_msg(f"双击左键: {cmd_value}")
-                        
-                        elif cmd_type == 3.0: # 右键
-                            mouseClick(
-                                1,
-                                "right",
-                                cmd_value,
-                                retry,
-                                should_stop=should_stop,
-                                on_warn=warn_once,
-                                scale_x=scale_x,
-                                scale_y=scale_y,
-                            )
-                            if callback_msg: callback_msg(f"右键单击: {cmd_value}")
-                        
-                        elif cmd_type == 4.0: # 输入
-                            pyperclip.copy(str(cmd_value))
-                            if _is_macos():
-                                pyautogui.hotkey("command", "v")
-                            else:
-                                pyautogui.hotkey("ctrl", "v")
-                            _cancellable_sleep(0.5, should_stop)
-                            if callback_msg: callback_msg(f"输入文本: {cmd_value}")
-                        
-                        elif cmd_type == 5.0: # 等待
-                            sleep_time = float(cmd_value)
-                            _cancellable_sleep(sleep_time, should_stop)
-                            if callback_msg: callback_msg(f"等待 {sleep_time} 秒")
-                        
-                        elif cmd_type == 6.0: # 滚轮
-                            scroll_val = int(cmd_value)
-                            pyautogui.scroll(scroll_val)
-                            if callback_msg: callback_msg(f"滚轮滑动 {scroll_val}")
-
-                        elif cmd_type == 7.0: # 系统按键 (组合键)
-                            keys = str(cmd_value).lower().split('+')
-                            # 去除空格
-                            keys = [k.strip() for k in keys]
-                            # 轻量兼容别名：cmd/control/option 等
-                            key_alias = {
-                                "cmd": "command",
-                                "command": "command",
-                                "ctl": "ctrl",
-                                "control": "ctrl",
-                                "option": "alt",
-                                "win": "winleft",
-                                "windows": "winleft",
-                                "super": "winleft",
-                            }
-                            keys = [key_alias.get(k, k) for k in keys if k]
-                            pyautogui.hotkey(*keys)
-                            if callback_msg: callback_msg(f"按键组合: {cmd_value}")
-
-                        elif cmd_type == 8.0: # 鼠标悬停
-                            mouseMove(
-                                cmd_value,
-                                retry,
-                                should_stop=should_stop,
-                                on_warn=warn_once,
-                                scale_x=scale_x,
-                                scale_y=scale_y,
-                            )
-                            if callback_msg: callback_msg(f"鼠标悬停: {cmd_value}")
-
-                        elif cmd_type == 9.0: # 截图保存
-                            path = str(cmd_value)
-                            # 如果是目录，自动拼接时间戳文件名
-                            if os.path.isdir(path):
-                                timestamp = time.strftime("%Y%m%d_%H%M%S")
-                                filename = os.path.join(path, f"screenshot_{timestamp}.png")
-                            else:
-                                # 兼容旧逻辑：如果用户直接输入了带文件名的路径
-                                filename = path
-                                if not filename.endswith(('.png', '.jpg', '.bmp')):
-                                    filename += '.png'
-                            
-                            pyautogui.screenshot(filename)
-                            if callback_msg: callback_msg(f"截图已保存: {filename}")
-                        else:
+                        if handler is None:
                             raise StepFailed(f"未知指令类型: {cmd_type}")
-
+                        msg = handler(task, needle)
+                        if callback_msg: callback_msg(msg)
                     except StepFailed as e:
                         if callback_msg:
                             callback_msg(f"步骤 {idx+1} 失败: 类型={cmd_type}, 内容={cmd_value}, 原因={e}")
@@ -502,7 +1496,7 @@ class RPAEngine:
                     break
                 
                 if callback_msg: callback_msg("等待 0.1 秒进入下一轮循环...")
-                _cancellable_sleep(0.1, should_stop)
+                _cancellable_sleep(0.1, stop_event)
                 
         except TaskStopped:
             if callback_msg:
@@ -512,30 +1506,58 @@ class RPAEngine:
             traceback.print_exc()
         finally:
             self.is_running = False
+            # 截图资源（mss 持有显示连接/DC）排到找图线程上、在正在进行的那次截图之后释放，
+            # 停止时不必等它做完
+            executor, self._executor = self._executor, None
+            executor.submit(_release_screen_grabbers)
+            executor.shutdown(wait=False)
+            self._retired_executor = executor
             if callback_msg: callback_msg("任务结束")
 
 # --------------------------
 # GUI 界面 (原 rpa_gui.py)
 # --------------------------
 
+def _dump_config(filename: str, tasks: list):
+    """保存配置（UTF-8 JSON）；有 orjson 时用 orjson 编码。"""
+    if orjson is not None:
+        with open(filename, 'wb') as f:
+            f.write(orjson.dumps(tasks, option=orjson.OPT_INDENT_2))
+        return
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(tasks, f, indent=4, ensure_ascii=False)
+
+
+def _load_config(filename: str):
+    """读取配置；有 orjson 时用 orjson 解码。"""
+    if orjson is not None:
+        with open(filename, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
 # 定义操作类型映射
 CMD_TYPES = {
-    "左键单击": 1.0,
-    "左键双击": 2.0,
-    "右键单击": 3.0,
-    "输入文本": 4.0,
-    "等待(秒)": 5.0,
-    "滚轮滑动": 6.0,
-    "系统按键": 7.0,
-    "鼠标悬停": 8.0,
-    "截图保存": 9.0
+    "左键单击": 1,
+    "左键双击": 2,
+    "右键单击": 3,
+    "输入文本": 4,
+    "等待(秒)": 5,
+    "滚轮滑动": 6,
+    "系统按键": 7,
+    "鼠标悬停": 8,
+    "截图保存": 9
 }
 
 CMD_TYPES_REV = {v: k for k, v in CMD_TYPES.items()}
+# 下拉框选项，每新增一行都会用到，只生成一次
+_CMD_KEYS = tuple(CMD_TYPES)
 
 class WorkerThread(QThread):
-    log_signal = Signal(str)
     finished_signal = Signal()
+    # (文本, 本次调用专用的 threading.Event)
+    clipboard_signal = Signal(str, object)
 
     def __init__(self, engine, tasks, loop_forever):
         super().__init__()
@@ -543,15 +1565,102 @@ class WorkerThread(QThread):
         self.tasks = tasks
         self.loop_forever = loop_forever
 
+        # QThread 对象本身属于 GUI 线程，信号会排队到 GUI 线程执行
+        self.clipboard_signal.connect(self._write_clipboard)
+
+        # 日志先攒在缓冲区，由 GUI 线程的定时器批量取走，不再每条日志发一次跨线程信号
+        self._log_mutex = QMutex()
+        self._log_buffer = collections.deque(maxlen=5000)
+
     def run(self):
-        self.engine.run_tasks(self.tasks, self.loop_forever, self.log_callback)
+        self.engine.run_tasks(self.tasks, self.loop_forever, self.log_callback, self.set_clipboard)
         self.finished_signal.emit()
 
     def log_callback(self, msg):
-        self.log_signal.emit(msg)
+        with QMutexLocker(self._log_mutex):
+            self._log_buffer.append(msg)
+
+    def take_logs(self) -> list:
+        """GUI 线程调用：取走目前缓冲的全部日志。"""
+        with QMutexLocker(self._log_mutex):
+            lines = list(self._log_buffer)
+            self._log_buffer.clear()
+        return lines
+
+    def set_clipboard(self, text):
+        """
+        工作线程调用：交给 GUI 线程用 QClipboard 写入（进程内调用，
+        不像 pyperclip 那样可能要起 pbcopy/xclip 子进程），并等待写入完成。
+        GUI 线程 1 秒内无响应则退回 pyperclip。
+        每次调用用自己的 Event：超时调用的槽函数晚到时只会置位它自己的 Event，
+        不会提前唤醒下一次调用、让它粘贴上一段文本。
+        """
+        done = threading.Event()
+        self.clipboard_signal.emit(text, done)
+        if not done.wait(1.0):
+            pyperclip.copy(text)
+
+    def _write_clipboard(self, text, done):
+        QGuiApplication.clipboard().setText(text)
+        done.set()
+
+class RegionSelector(QWidget):
+    """全屏半透明遮罩：鼠标拖拽框选搜索区域，Esc 取消。"""
+    # 框选结果 (x, y, w, h)，使用 pyautogui 的屏幕坐标；取消时为 None
+    selection_finished = Signal(object)
+
+    def __init__(self):
+        super().__init__(None, Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.setCursor(Qt.CrossCursor)
+        self.setGeometry(QGuiApplication.primaryScreen().geometry())
+
+        self._origin = None
+        self._result = None
+        self._rubber_band = QRubberBand(QRubberBand.Rectangle, self)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(0, 0, 0, 80))
+
+    def mousePressEvent(self, event):
+        self._origin = event.position().toPoint()
+        self._rubber_band.setGeometry(QRect(self._origin, QSize()))
+        self._rubber_band.show()
+
+    def mouseMoveEvent(self, event):
+        if self._origin is not None:
+            self._rubber_band.setGeometry(QRect(self._origin, event.position().toPoint()).normalized())
+
+    def mouseReleaseEvent(self, event):
+        if self._origin is None:
+            return
+        rect = QRect(self._origin, event.position().toPoint()).normalized()
+        if rect.width() > 1 and rect.height() > 1:
+            top_left = self.mapToGlobal(rect.topLeft())
+            # macOS 上 pyautogui 用点坐标，与 Qt 逻辑坐标一致；
+            # 其他平台 pyautogui 用物理像素，需要乘以缩放比例
+            ratio = 1.0 if _is_macos() else self.devicePixelRatioF()
+            self._result = (
+                int(round(top_left.x() * ratio)),
+                int(round(top_left.y() * ratio)),
+                int(round(rect.width() * ratio)),
+                int(round(rect.height() * ratio)),
+            )
+        self.close()
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_Escape:
+            self.close()
+
+    def closeEvent(self, event):
+        self.selection_finished.emit(self._result)
+        event.accept()
+
 
 class TaskRow(QFrame):
-    def __init__(self, parent_layout, delete_callback):
+    def __init__(self, parent_layout, delete_callback, data=None):
         super().__init__()
         self.setFrameShape(QFrame.StyledPanel)
         self.layout = QHBoxLayout(self)
@@ -559,7 +1668,7 @@ class TaskRow(QFrame):
         
         # 操作类型选择
         self.type_combo = QComboBox()
-        self.type_combo.addItems(list(CMD_TYPES.keys()))
+        self.type_combo.addItems(_CMD_KEYS)
         self.type_combo.currentTextChanged.connect(self.on_type_changed)
         self.layout.addWidget(self.type_combo)
         
@@ -574,6 +1683,17 @@ class TaskRow(QFrame):
         self.file_btn.setVisible(True) # 默认是左键单击，需要显示
         self.layout.addWidget(self.file_btn)
         
+        # 搜索区域 (可选，仅图片相关操作)
+        self.region_input = QLineEdit()
+        self.region_input.setPlaceholderText("区域 x,y,w,h (可选)")
+        self.region_input.setFixedWidth(130)
+        self.layout.addWidget(self.region_input)
+
+        self.region_btn = QPushButton("框选区域")
+        self.region_btn.clicked.connect(self.select_region)
+        self.layout.addWidget(self.region_btn)
+        self._region_selector = None
+
         # 重试次数 (默认隐藏)
         self.retry_input = QLineEdit()
         self.retry_input.setPlaceholderText("重试次数 (1=一次, -1=无限)")
@@ -581,6 +1701,23 @@ class TaskRow(QFrame):
         self.retry_input.setFixedWidth(100)
         self.retry_input.setVisible(True)
         self.layout.addWidget(self.retry_input)
+
+        # 鼠标移动耗时 / 多次点击间隔 (可选，默认 0)
+        self.duration_input = QLineEdit()
+        self.duration_input.setPlaceholderText("移动耗时(秒)")
+        self.duration_input.setFixedWidth(90)
+        self.layout.addWidget(self.duration_input)
+
+        self.interval_input = QLineEdit()
+        self.interval_input.setPlaceholderText("点击间隔(秒)")
+        self.interval_input.setFixedWidth(90)
+        self.layout.addWidget(self.interval_input)
+
+        # 按键输入 (仅输入文本，默认隐藏)
+        self.keys_check = QCheckBox("按键输入")
+        self.keys_check.setToolTip("纯英文文本直接发送按键，不占用剪贴板；目标窗口开着中文输入法时不要勾选")
+        self.keys_check.setVisible(False)
+        self.layout.addWidget(self.keys_check)
         
         # 删除按钮
         self.del_btn = QPushButton("X")
@@ -589,44 +1726,66 @@ class TaskRow(QFrame):
         self.del_btn.clicked.connect(lambda: delete_callback(self))
         self.layout.addWidget(self.del_btn)
         
-        parent_layout.addWidget(self)
+        # 先回填数据再放进布局：此时行还未显示，控件显隐切换不会触发整个列表重排
+        if data:
+            self.set_data(data)
+
+        # 插到底部弹簧之前，弹簧始终是最后一项，不需要反复移除/加回
+        parent_layout.insertWidget(parent_layout.count() - 1, self)
 
     def on_type_changed(self, text):
         cmd_type = CMD_TYPES[text]
         
         # 图片相关操作 (1, 2, 3, 8)
-        if cmd_type in [1.0, 2.0, 3.0, 8.0]:
+        if cmd_type in _IMAGE_CMD_TYPES:
             self.file_btn.setVisible(True)
             self.file_btn.setText("选择图片")
             self.retry_input.setVisible(True)
+            self.region_input.setVisible(True)
+            self.region_btn.setVisible(True)
             self.value_input.setPlaceholderText("图片路径")
         # 输入 (4)
-        elif cmd_type == 4.0:
+        elif cmd_type == 4:
             self.file_btn.setVisible(False)
             self.retry_input.setVisible(False)
+            self.region_input.setVisible(False)
+            self.region_btn.setVisible(False)
             self.value_input.setPlaceholderText("请输入要发送的文本")
         # 等待 (5)
-        elif cmd_type == 5.0:
+        elif cmd_type == 5:
             self.file_btn.setVisible(False)
             self.retry_input.setVisible(False)
+            self.region_input.setVisible(False)
+            self.region_btn.setVisible(False)
             self.value_input.setPlaceholderText("等待秒数 (如 1.5)")
         # 滚轮 (6)
-        elif cmd_type == 6.0:
+        elif cmd_type == 6:
             self.file_btn.setVisible(False)
             self.retry_input.setVisible(False)
+            self.region_input.setVisible(False)
+            self.region_btn.setVisible(False)
             self.value_input.setPlaceholderText("滚动距离 (正数向上，负数向下)")
         # 系统按键 (7)
-        elif cmd_type == 7.0:
+        elif cmd_type == 7:
             self.file_btn.setVisible(False)
             self.retry_input.setVisible(False)
+            self.region_input.setVisible(False)
+            self.region_btn.setVisible(False)
             self.value_input.setPlaceholderText("组合键 (如 ctrl+s, alt+tab)")
         # 截图保存 (9)
-        elif cmd_type == 9.0:
+        elif cmd_type == 9:
             self.file_btn.setVisible(True)
             self.file_btn.setText("选择保存文件夹")
             self.retry_input.setVisible(False)
+            self.region_input.setVisible(False)
+            self.region_btn.setVisible(False)
             self.value_input.setPlaceholderText("保存目录 (如 D:\\Screenshots)")
 
+        # 移动耗时对所有图片操作有效；点击间隔只对点击 (1, 2, 3) 有效
+        self.duration_input.setVisible(cmd_type in _IMAGE_CMD_TYPES)
+        self.interval_input.setVisible(cmd_type in (1, 2, 3))
+        self.keys_check.setVisible(cmd_type == 4)
+
     def set_data(self, data):
         """用于回填数据"""
         cmd_type = data.get("type")
@@ -643,11 +1802,20 @@ class TaskRow(QFrame):
         # 设置重试次数
         self.retry_input.setText(str(retry))
 
+        # 设置搜索区域
+        region = _parse_region(data.get("region"))
+        self.region_input.setText(",".join(str(v) for v in region) if region else "")
+
+        # 设置移动耗时 / 点击间隔 (0 显示为空)
+        self.duration_input.setText(str(data["duration"]) if data.get("duration") else "")
+        self.interval_input.setText(str(data["interval"]) if data.get("interval") else "")
+        self.keys_check.setChecked(bool(data.get("type_keys", False)))
+
     def select_file(self):
         cmd_type = CMD_TYPES[self.type_combo.currentText()]
         
-        # 截图保存 (9.0) -> 选择文件夹
-        if cmd_type == 9.0:
+        # 截图保存 (9) -> 选择文件夹
+        if cmd_type == 9:
             folder = QFileDialog.getExistingDirectory(self, "选择保存文件夹", os.getcwd())
             if folder:
                 self.value_input.setText(folder)
@@ -658,13 +1826,32 @@ class TaskRow(QFrame):
             if filename:
                 self.value_input.setText(filename)
 
+    def select_region(self):
+        # 先最小化主窗口，避免遮挡要框选的内容
+        self.window().showMinimized()
+        QTimer.singleShot(300, self._show_region_selector)
+
+    def _show_region_selector(self):
+        self._region_selector = RegionSelector()
+        self._region_selector.selection_finished.connect(self._on_region_selected)
+        self._region_selector.show()
+        self._region_selector.activateWindow()
+
+    def _on_region_selected(self, region):
+        self._region_selector = None
+        if region:
+            self.region_input.setText(",".join(str(v) for v in region))
+        window = self.window()
+        window.showNormal()
+        window.activateWindow()
+
     def get_data(self):
         cmd_type = CMD_TYPES[self.type_combo.currentText()]
         value = self.value_input.text()
         
         # 数据校验与转换
         try:
-            if cmd_type in [5.0, 6.0]:
+            if cmd_type in (5, 6):
                 # 尝试转换为数字，如果失败可能会在运行时报错，这里简单处理
                 if not value: value = "0"
             
@@ -676,11 +1863,27 @@ class TaskRow(QFrame):
         except ValueError:
             pass # 保持默认
 
-        return {
+        data = {
             "type": cmd_type,
             "value": value,
             "retry": retry
         }
+        if self.region_input.isVisible():
+            region = _parse_region(self.region_input.text())
+            if region:
+                data["region"] = list(region)
+        for key, edit in (("duration", self.duration_input), ("interval", self.interval_input)):
+            if not edit.isVisible():
+                continue
+            try:
+                seconds = float(edit.text())
+            except ValueError:
+                continue  # 空或非法输入按默认 0 处理，不写入配置
+            if seconds > 0:
+                data[key] = seconds
+        if self.keys_check.isVisible() and self.keys_check.isChecked():
+            data["type_keys"] = True
+        return data
 
 class RPAWindow(QMainWindow):
     def __init__(self):
@@ -741,26 +1944,39 @@ class RPAWindow(QMainWindow):
         main_layout.addWidget(scroll)
 
         # 日志区域
-        self.log_area = QTextEdit()
+        self.log_area = QPlainTextEdit()
         self.log_area.setReadOnly(True)
         self.log_area.setMaximumHeight(150)
+        # 长时间循环运行时限制日志行数，避免内存和排版开销无限增长
+        self.log_area.setMaximumBlockCount(1000)
+
+        # 工作线程的日志由定时器每 50ms 批量取出并一次性追加，
+        # 避免每条日志都触发一次跨线程信号 + 控件重排
+        self._log_timer = QTimer(self)
+        self._log_timer.setInterval(50)
+        self._log_timer.timeout.connect(self._flush_logs)
         main_layout.addWidget(QLabel("运行日志:"))
         main_layout.addWidget(self.log_area)
 
+        # 显示器分辨率/缩放变化时让缩放比例缓存失效
+        app = QGuiApplication.instance()
+        for screen in QGuiApplication.screens():
+            self._watch_screen(screen)
+        app.screenAdded.connect(self._watch_screen)
+        app.screenRemoved.connect(_invalidate_scale_cache)
+        app.primaryScreenChanged.connect(_invalidate_scale_cache)
+
         # 初始添加一行
         self.add_row()
 
+    def _watch_screen(self, screen):
+        _invalidate_scale_cache()
+        screen.geometryChanged.connect(_invalidate_scale_cache)
+        screen.logicalDotsPerInchChanged.connect(_invalidate_scale_cache)
+
     def add_row(self, data=None):
-        # 移除底部的弹簧
-        self.task_layout.takeAt(self.task_layout.count() - 1)
-        
-        row = TaskRow(self.task_layout, self.delete_row)
-        if data:
-            row.set_data(data)
+        row = TaskRow(self.task_layout, self.delete_row, data)
         self.rows.append(row)
-        
-        # 加回弹簧
-        self.task_layout.addStretch()
 
     def delete_row(self, row_widget):
         if row_widget in self.rows:
@@ -781,8 +1997,7 @@ class RPAWindow(QMainWindow):
         filename, _ = QFileDialog.getSaveFileName(self, "保存配置", os.getcwd(), "JSON Files (*.json);;Text Files (*.txt)")
         if filename:
             try:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(tasks, f, indent=4, ensure_ascii=False)
+                _dump_config(filename, tasks)
                 QMessageBox.information(self, "成功", "配置已保存！")
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"保存失败: {e}")
@@ -793,20 +2008,22 @@ class RPAWindow(QMainWindow):
             return
             
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                tasks = json.load(f)
+            tasks = _load_config(filename)
             
             if not isinstance(tasks, list):
                 raise ValueError("文件格式不正确")
 
-            # 清空现有行
-            for row in self.rows:
-                row.deleteLater()
-            self.rows.clear()
-            
-            # 重新添加行
-            for task in tasks:
-                self.add_row(task)
+            # 清空并重建所有行：期间暂停重绘，结束后统一刷新一次
+            self.task_container.setUpdatesEnabled(False)
+            try:
+                for row in self.rows:
+                    row.deleteLater()
+                self.rows.clear()
+
+                for task in tasks:
+                    self.add_row(task)
+            finally:
+                self.task_container.setUpdatesEnabled(True)
                 
             QMessageBox.information(self, "成功", f"成功导入 {len(tasks)} 条指令！")
             
@@ -820,7 +2037,7 @@ class RPAWindow(QMainWindow):
             if not data['value']:
                 QMessageBox.warning(self, "警告", "请检查有空参数的指令！")
                 return
-            tasks.append(data)
+            tasks.append(Task.from_dict(data))
             
         if not tasks:
             QMessageBox.warning(self, "警告", "请至少添加一条指令！")
@@ -836,8 +2053,8 @@ class RPAWindow(QMainWindow):
         loop = (self.loop_check.currentText() == "循环执行")
         
         self.worker = WorkerThread(self.engine, tasks, loop)
-        self.worker.log_signal.connect(self.log)
         self.worker.finished_signal.connect(self.on_finished)
+        self._log_timer.start()
         self.worker.start()
 
         # 最小化窗口
@@ -848,6 +2065,8 @@ class RPAWindow(QMainWindow):
         self.log("正在停止...")
 
     def on_finished(self):
+        self._log_timer.stop()
+        self._flush_logs()
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         self.add_btn.setEnabled(True)
@@ -858,7 +2077,16 @@ class RPAWindow(QMainWindow):
         self.activateWindow()
 
     def log(self, msg):
-        self.log_area.append(msg)
+        # 先刷出缓冲区里的工作线程日志，保证顺序
+        self._flush_logs()
+        self.log_area.appendPlainText(msg)
+
+    def _flush_logs(self):
+        if self.worker is None:
+            return
+        lines = self.worker.take_logs()
+        if lines:
+            self.log_area.appendPlainText("\n".join(lines))
 
     def closeEvent(self, event):
         """窗口关闭事件：确保线程停止，防止残留"""